@@ -0,0 +1,239 @@
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from jose import JWTError
+from starlette.responses import JSONResponse
+
+from auth_utils import decode_access_token
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# name: (concurrency limit, queue size, queue timeout seconds, Retry-After seconds)
+# A queue size of 0 sheds as soon as every slot is busy.
+DEFAULT_CLASSES = {
+    "auth": (8, 32, 5.0, 1),
+    "writes": (8, 32, 5.0, 1),
+    "analytics": (4, 0, 0.0, 5),
+    "lists": (8, 16, 2.0, 2),
+}
+
+# Set ADMISSION_RATE_PER_SECOND=0 to turn per-client rate limiting off
+RATE_LIMIT_PER_SECOND = float(os.getenv("ADMISSION_RATE_PER_SECOND", "10"))
+RATE_LIMIT_BURST = float(os.getenv("ADMISSION_RATE_BURST", "40"))
+MAX_TRACKED_CLIENTS = int(os.getenv("ADMISSION_MAX_CLIENTS", "10000"))
+
+
+def _env(name: str, field: str, default, cast):
+    return cast(os.getenv(f"ADMISSION_{name.upper()}_{field}", default))
+
+
+def classify(method: str, path: str) -> Optional[str]:
+    """
+    Map a request onto a route class, or None to let it through unmetered.
+    """
+    if method == "OPTIONS":
+        return None
+    if path.startswith("/auth/"):
+        return "auth"
+    if path.startswith("/analytics/"):
+        return "analytics"
+    if method in WRITE_METHODS:
+        return "writes"
+    if path.startswith(("/organization/", "/admin/", "/students/")):
+        return "lists"
+    return None
+
+
+class RouteClass:
+    """
+    Concurrency limit with a bounded wait queue for one class of routes.
+    """
+
+    def __init__(self, name: str, limit: int, queue_size: int, timeout: float, retry_after: int):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._semaphore = asyncio.Semaphore(limit)
+        self.active = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    async def acquire(self) -> bool:
+        if self._semaphore.locked():
+            if self.queued >= self.queue_size:
+                self.rejected += 1
+                return False
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                return False
+            finally:
+                self.queued -= 1
+        else:
+            await self._semaphore.acquire()
+
+        self.active += 1
+        self.admitted += 1
+        return True
+
+    def release(self):
+        self.active -= 1
+        self._semaphore.release()
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": self.limit,
+            "queue_size": self.queue_size,
+            "active": self.active,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+class TokenBuckets:
+    """
+    Per-client token buckets refilled at `rate` tokens per second up to `burst`.
+
+    A rate of 0 or less disables rate limiting. At most `max_clients` buckets
+    are kept; the least recently seen client is evicted first, which at worst
+    hands it a fresh burst.
+    """
+
+    def __init__(self, rate: float, burst: float, max_clients: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max(1, max_clients)
+        self.enabled = rate > 0 and burst > 0
+        self._buckets = OrderedDict()
+        self.limited = 0
+
+    def take(self, client: str) -> float:
+        """
+        Spend one token for `client`. Returns 0 when allowed, otherwise the
+        number of seconds until a token is available.
+        """
+        if not self.enabled:
+            return 0
+
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+
+        if tokens < 1:
+            self._buckets[client] = (tokens, now)
+            self.limited += 1
+            return (1 - tokens) / self.rate
+
+        self._buckets[client] = (tokens - 1, now)
+        while len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return 0
+
+    def snapshot(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "clients": len(self._buckets),
+            "limited": self.limited,
+        }
+
+
+def client_key(scope) -> str:
+    """
+    Identify the caller by JWT `sub` when a valid bearer token is present,
+    falling back to the peer address.
+    """
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                try:
+                    sub = decode_access_token(token).get("sub")
+                except JWTError:
+                    sub = None
+                if sub:
+                    return f"sub:{sub}"
+            break
+
+    client = scope.get("client")
+    return f"ip:{client[0]}" if client else "ip:unknown"
+
+
+class AdmissionController:
+    def __init__(self):
+        self.classes = {}
+        for name, (limit, queue_size, timeout, retry_after) in DEFAULT_CLASSES.items():
+            self.classes[name] = RouteClass(
+                name,
+                limit=_env(name, "LIMIT", limit, int),
+                queue_size=_env(name, "QUEUE", queue_size, int),
+                timeout=_env(name, "TIMEOUT", timeout, float),
+                retry_after=_env(name, "RETRY_AFTER", retry_after, int),
+            )
+        self.rate_limiter = TokenBuckets(RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST, MAX_TRACKED_CLIENTS)
+
+    def snapshot(self) -> dict:
+        return {
+            "classes": {name: route_class.snapshot() for name, route_class in self.classes.items()},
+            "rate_limit": self.rate_limiter.snapshot(),
+        }
+
+
+controller = AdmissionController()
+
+
+def _too_many_requests(detail: str, retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"detail": detail},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying per-client rate limits and per-class concurrency
+    limits before a request reaches the worker threadpool.
+    """
+
+    def __init__(self, app, controller: AdmissionController = controller):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        name = classify(scope["method"], scope["path"])
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        wait = self.controller.rate_limiter.take(client_key(scope))
+        if wait:
+            await _too_many_requests("Rate limit exceeded", wait)(scope, receive, send)
+            return
+
+        route_class = self.controller.classes[name]
+        if not await route_class.acquire():
+            await _too_many_requests("Server busy, retry later", route_class.retry_after)(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route_class.release()
@@ -1,9 +1,13 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from admission import AdmissionMiddleware, controller as admission_controller
 from routers import auth, organizations, admins, students, analytics
 
 app = FastAPI()
 
+# Registered before CORS so CORS stays outermost and 429 responses carry its headers
+app.add_middleware(AdmissionMiddleware, controller=admission_controller)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -21,4 +25,8 @@ app.include_router(analytics.router)
 
 @app.get("/")
 def read_root():
-    return {"message": "Welcome to the API"}
\ No newline at end of file
+    return {"message": "Welcome to the API"}
+
+@app.get("/admission/metrics")
+def admission_metrics():
+    return admission_controller.snapshot()
\ No newline at end of file
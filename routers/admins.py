@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, Body, Query
 from models import AdminCreate, AdminUpdate
 from database import supabase
+from search_index import admin_index, organization_index, SearchMode
 
 router = APIRouter(prefix="/admin", tags=["Admins"])
 
@@ -11,11 +12,15 @@ def add_admin(admin: AdminCreate):
     if existing_auth.data:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    # Step 2: Lookup organization by name
-    org_lookup = supabase.table("organizations").select("id").eq("name", admin.org_name).execute()
-    if not org_lookup.data:
-        raise HTTPException(status_code=404, detail="Organization not found")
-    org_id = org_lookup.data[0]['id']
+    # Step 2: Lookup organization by name, falling back to the database when the index can't answer
+    org = organization_index.find("name", admin.org_name)
+    if org:
+        org_id = org['id']
+    else:
+        org_lookup = supabase.table("organizations").select("id").eq("name", admin.org_name).execute()
+        if not org_lookup.data:
+            raise HTTPException(status_code=404, detail="Organization not found")
+        org_id = org_lookup.data[0]['id']
 
     # Step 3: Insert admin record
     admin_response = supabase.table("admins").insert({
@@ -35,6 +40,9 @@ def add_admin(admin: AdminCreate):
         "role": "admin"
     }).execute()
 
+    # Re-read so the index row carries the joined organization name
+    for row in admin_response.data:
+        admin_index.reload(row["id"])
     return {"message": "Admin added", "data": admin_response.data}
 
 @router.get("/list")
@@ -47,6 +55,14 @@ def list_admins(org_id: str = Query(default=None)):
     response = query.execute()
     return {"admins": response.data}
 
+@router.get("/search")
+def search_admins(
+    q: str = Query(..., min_length=1, description="Matched against name and email"),
+    limit: int = Query(20, ge=1, le=100),
+    mode: SearchMode = Query("substring", description="Match mode: substring, prefix")
+):
+    return {"admins": admin_index.search(q, limit=limit, mode=mode)}
+
 @router.put("/update/{admin_id}")
 def update_admin(admin_id: str, updated_data: dict = Body(...)):
     # Get current admin data
@@ -75,6 +91,7 @@ def update_admin(admin_id: str, updated_data: dict = Body(...)):
     if auth_updates:
         supabase.table("auth").update(auth_updates).eq("email", current_email).execute()
     
+    admin_index.reload(admin_id)
     return {"message": "Admin updated", "data": admin_response.data}
 
 @router.delete("/delete/{admin_id}")
@@ -84,4 +101,5 @@ def delete_admin(admin_id: str):
     if result.error:
         raise HTTPException(status_code=500, detail="Failed to delete admin")
 
+    admin_index.remove(admin_id)
     return {"message": "Admin deleted successfully"}
\ No newline at end of file
@@ -1,10 +1,29 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, HTTPException, Query
 from typing import Optional
 from datetime import datetime, timedelta
 from database import supabase
+from timeline_utils import Timeline, get_zone, resolve_range
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
+# Default bucket size for each timeline timeframe
+TIMEFRAME_GRANULARITY = {
+    "7days": "day",
+    "15days": "day",
+    "1month": "week",
+    "quarter": "month",
+    "halfyear": "month",
+    "year": "month",
+}
+
+def _build_timeline(timeframe, granularity, start_date, end_date, tz):
+    try:
+        zone = get_zone(tz)
+        start, end = resolve_range(timeframe, start_date, end_date, zone)
+        return Timeline(start, end, granularity, zone)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/students")
 def get_students_for_analytics(
     org_id: Optional[str] = Query(None),
@@ -130,7 +149,11 @@ def get_organizations_by_status(
 
 @router.get("/organizations/timeline")
 def get_organizations_timeline(
-    timeframe: str = Query("7days", description="Time period: 7days, 15days, 1month, quarter, halfyear, year")
+    timeframe: str = Query("7days", description="Time period: 7days, 15days, 1month, quarter, halfyear, year"),
+    granularity: Optional[str] = Query(None, description="Bucket size: hour, day, week, month (defaults by timeframe)"),
+    start_date: Optional[str] = Query(None, description="Optional custom start date (YYYY-MM-DD)"),
+    end_date: Optional[str] = Query(None, description="Optional custom end date (YYYY-MM-DD)"),
+    tz: str = Query("UTC", description="IANA time zone used for bucket boundaries")
 ):
     """
     Get organization counts over time, formatted for timeline charts.
@@ -143,230 +166,84 @@ def get_organizations_timeline(
         "under verification": "verification"
     }
 
-    today = datetime.now()
-    
-    if timeframe == "7days":
-        start_date = today - timedelta(days=7)
-        group_by = "day"
-    elif timeframe == "15days":
-        start_date = today - timedelta(days=15)
-        group_by = "day"
-    elif timeframe == "1month":
-        start_date = today - timedelta(days=30)
-        group_by = "week"
-    elif timeframe == "quarter":
-        start_date = today - timedelta(days=90)
-        group_by = "month"
-    elif timeframe == "halfyear":
-        start_date = today - timedelta(days=180)
-        group_by = "month"
-    elif timeframe == "year":
-        start_date = today - timedelta(days=365)
-        group_by = "month"
-    else:
-        start_date = today - timedelta(days=7)
-        group_by = "day"
-
-    start_str = start_date.strftime("%Y-%m-%d")
+    group_by = granularity or TIMEFRAME_GRANULARITY.get(timeframe, "day")
+    timeline = _build_timeline(timeframe, group_by, start_date, end_date, tz)
+    start_str, end_str = timeline.query_bounds()
 
     response = supabase.table("organizations") \
         .select("id, name, status, created_at") \
         .gte("created_at", start_str) \
-        .order("created_at") \
+        .lt("created_at", end_str) \
         .execute()
-    
-    organizations = response.data
-    result = []
-
-    if group_by == "day":
-        date_format = "%Y-%m-%d"
-        date_label_format = "%b %d"
-
-        date_counts = {}
-        current_date = start_date
-        while current_date <= today:
-            date_str = current_date.strftime(date_format)
-            date_counts[date_str] = {
-                "date": date_str,
-                "label": current_date.strftime(date_label_format),
-                "onboarded": 0,
-                "contacted": 0,
-                "standby": 0,
-                "verification": 0
-            }
-            current_date += timedelta(days=1)
-
-        for org in organizations:
-            org_date = datetime.fromisoformat(org["created_at"].replace("Z", "+00:00")).strftime(date_format)
-            status = org.get("status", "onboard")
-            mapped_status = status_key_map.get(status)
-
-            if mapped_status and mapped_status in date_counts[org_date]:
-                date_counts[org_date][mapped_status] += 1
-
-        result = list(date_counts.values())
-
-    elif group_by == "week":
-        weeks = []
-        week_start = start_date
-        while week_start <= today:
-            week_end = week_start + timedelta(days=6)
-            if week_end > today:
-                week_end = today
-            week_label = f"Week {len(weeks) + 1}"
-            weeks.append({
-                "start": week_start,
-                "end": week_end,
-                "label": week_label,
-                "onboarded": 0,
-                "contacted": 0,
-                "standby": 0,
-                "verification": 0
-            })
-            week_start = week_end + timedelta(days=1)
 
-        for org in organizations:
-            org_date = datetime.fromisoformat(org["created_at"].replace("Z", "+00:00"))
-            status = org.get("status", "onboard")
-            mapped_status = status_key_map.get(status)
-
-            for week in weeks:
-                if week["start"] <= org_date <= week["end"]:
-                    if mapped_status and mapped_status in week:
-                        week[mapped_status] += 1
-                    break
-
-        result = [
-            {
-                "name": week["label"],
-                "onboarded": week["onboarded"],
-                "contacted": week["contacted"],
-                "standby": week["standby"],
-                "verification": week["verification"]
-            }
-            for week in weeks
-        ]
-
-    elif group_by == "month":
-        months = []
-        current_month = datetime(start_date.year, start_date.month, 1)
-
-        while current_month <= today:
-            next_month = datetime(
-                current_month.year + (1 if current_month.month == 12 else 0),
-                1 if current_month.month == 12 else current_month.month + 1,
-                1
-            )
-            month_label = current_month.strftime("%b")
-            months.append({
-                "start": current_month,
-                "end": next_month - timedelta(days=1),
-                "label": month_label,
-                "onboarded": 0,
-                "contacted": 0,
-                "standby": 0,
-                "verification": 0
-            })
-            current_month = next_month
-
-        for org in organizations:
-            org_date = datetime.fromisoformat(org["created_at"].replace("Z", "+00:00"))
-            status = org.get("status", "onboard")
-            mapped_status = status_key_map.get(status)
-
-            for month in months:
-                if month["start"] <= org_date <= month["end"]:
-                    if mapped_status and mapped_status in month:
-                        month[mapped_status] += 1
-                    break
+    result = timeline.tally(
+        response.data,
+        keys=status_key_map.values(),
+        key_for=lambda org: status_key_map.get(org.get("status") or "onboard")
+    )
 
-        result = [
-            {
-                "name": month["label"],
-                "onboarded": month["onboarded"],
-                "contacted": month["contacted"],
-                "standby": month["standby"],
-                "verification": month["verification"]
-            }
-            for month in months
-        ]
+    # Week and month charts read the bucket label from "name"
+    if group_by in ("week", "month"):
+        for row in result:
+            row["name"] = row["label"]
 
     return {
         "data": result,
         "timeframe": timeframe,
-        "group_by": group_by
+        "group_by": group_by,
+        "tz": tz,
+        "date_range": {
+            "start": start_str,
+            "end": end_str
+        }
     }
 
 @router.get("/students/timeline")
 def get_students_timeline(
-    timeframe: str = Query("7days", description="Time period: 7days, 15days, 1month, quarter"),
+    timeframe: str = Query("7days", description="Time period: 7days, 15days, 1month, quarter, halfyear, year"),
     language: Optional[str] = Query(None, description="Filter by language"),
-    org_id: Optional[str] = Query(None, description="Filter by organization ID")
+    org_id: Optional[str] = Query(None, description="Filter by organization ID"),
+    granularity: str = Query("day", description="Bucket size: hour, day, week, month"),
+    start_date: Optional[str] = Query(None, description="Optional custom start date (YYYY-MM-DD)"),
+    end_date: Optional[str] = Query(None, description="Optional custom end date (YYYY-MM-DD)"),
+    tz: str = Query("UTC", description="IANA time zone used for bucket boundaries")
 ):
     """
     Get student counts over time, formatted for timeline charts.
+
+    Buckets are daily unless `granularity` asks for hour, week or month.
     """
-    # Calculate start date based on timeframe
-    today = datetime.now()
-    
-    if timeframe == "7days":
-        start_date = today - timedelta(days=7)
-    elif timeframe == "15days":
-        start_date = today - timedelta(days=15)
-    elif timeframe == "1month":
-        start_date = today - timedelta(days=30)
-    elif timeframe == "quarter":
-        start_date = today - timedelta(days=90)
-    else:
-        start_date = today - timedelta(days=7)
-    
-    # Format start date for Supabase query
-    start_str = start_date.strftime("%Y-%m-%d")
-    
+    group_by = granularity
+    timeline = _build_timeline(timeframe, group_by, start_date, end_date, tz)
+    start_str, end_str = timeline.query_bounds()
+
     # Build the query
-    query = supabase.table("students").select("id, name, language, created_at, org_id").gte("created_at", start_str)
-    
+    query = supabase.table("students") \
+        .select("id, name, language, created_at, org_id") \
+        .gte("created_at", start_str) \
+        .lt("created_at", end_str)
+
     # Add filters if provided
     if language:
         query = query.eq("language", language)
     if org_id:
         query = query.eq("org_id", org_id)
-    
+
     response = query.execute()
-    students = response.data
-    
-    # Format data by day
-    date_format = "%Y-%m-%d"
-    date_label_format = "%b %d"  # e.g., "Jan 01"
-    
-    # Create a dictionary to store counts by date
-    date_counts = {}
-    
-    # Initialize all dates in the range
-    current_date = start_date
-    while current_date <= today:
-        date_str = current_date.strftime(date_format)
-        date_counts[date_str] = {
-            "date": date_str,
-            "label": current_date.strftime(date_label_format),
-            "count": 0
-        }
-        current_date += timedelta(days=1)
-    
-    # Count students by date
-    for student in students:
-        student_date = datetime.fromisoformat(student["created_at"].replace("Z", "+00:00")).strftime(date_format)
-        if student_date in date_counts:
-            date_counts[student_date]["count"] += 1
-    
-    # Convert to list for the response
-    result = list(date_counts.values())
-    
+
+    result = timeline.tally(response.data, keys=("count",), key_for=lambda student: "count")
+
     return {
         "data": result,
         "timeframe": timeframe,
+        "group_by": group_by,
+        "tz": tz,
+        "date_range": {
+            "start": start_str,
+            "end": end_str
+        },
         "filters": {
             "language": language,
             "org_id": org_id
         }
-    }
\ No newline at end of file
+    }
@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException, Body, Path, Query
 from typing import Optional
 from models import OrganizationCreate
 from database import supabase
+from search_index import organization_index, SearchMode
 from enum import Enum
 
 router = APIRouter(prefix="/organization", tags=["Organizations"])
@@ -43,6 +44,7 @@ def add_organization(org: OrganizationCreate):
         "role": "org"
     }).execute()
     
+    organization_index.upsert_many(org_response.data)
     return {"message": "Organization added", "data": org_response.data}
 
 @router.get("/list")
@@ -50,6 +52,14 @@ def list_organizations():
     response = supabase.table("organizations").select("*").execute()
     return {"organizations": response.data}
 
+@router.get("/search")
+def search_organizations(
+    q: str = Query(..., min_length=1, description="Matched against name, head and email"),
+    limit: int = Query(20, ge=1, le=100),
+    mode: SearchMode = Query("substring", description="Match mode: substring, prefix")
+):
+    return {"organizations": organization_index.search(q, limit=limit, mode=mode)}
+
 @router.put("/update/{org_id}")
 def update_organization(org_id: str, updated_data: dict = Body(...)):
     # Get existing organization data
@@ -88,4 +98,5 @@ def update_organization(org_id: str, updated_data: dict = Body(...)):
     if auth_update_data:
         supabase.table("auth").update(auth_update_data).eq("email", existing_org_data["email"]).execute()
     
+    organization_index.upsert_many(org_response.data)
     return {"message": "Organization updated", "data": org_response.data}
\ No newline at end of file
@@ -0,0 +1,397 @@
+import os
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from typing import Literal, Optional, Sequence
+
+from database import supabase
+
+REFRESH_INTERVAL = float(os.getenv("SEARCH_REFRESH_SECONDS", "5"))
+# Incremental refreshes cannot see deletes made by other workers
+REBUILD_INTERVAL = float(os.getenv("SEARCH_REBUILD_SECONDS", "600"))
+PAGE_SIZE = 1000
+BULK_THRESHOLD = 64
+MAX_LIMIT = 100
+
+SearchMode = Literal["substring", "prefix"]
+
+_WORD_SPLIT = re.compile(r"[\W_]+")
+_EMPTY = frozenset()
+
+
+def normalize(value) -> str:
+    # NUL is reserved as the separator in _Postings blobs
+    return " ".join(str(value).replace("\0", "").casefold().split()) if value is not None else ""
+
+
+def _trigrams(value: str):
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+def _words(value: str):
+    return {word for word in _WORD_SPLIT.split(value) if word}
+
+
+def _prefix_range(entries, query: str):
+    """
+    Yield slots of the sorted (term, slot) entries whose term starts with `query`.
+    """
+    position = bisect_left(entries, (query,))
+    while position < len(entries):
+        term, slot = entries[position]
+        if not term.startswith(query):
+            return
+        yield slot
+        position += 1
+
+
+class _Postings:
+    """
+    Lookup structures for one snapshot of a table.
+
+    Every structure is split per field and then by the length of the full
+    normalized field value, so matches can be produced directly in rank
+    order and a lookup stops as soon as `limit` rows are found. Substring
+    matches use trigram postings, or for one- and two-character queries a
+    scan of NUL-joined same-length values.
+    """
+
+    def __init__(self, field_count: int):
+        self.rows = {}                                   # slot -> row
+        self.values = {}                                 # slot -> normalized field values
+        self.slots = {}                                  # str(row id) -> slot
+        self.value_terms = [{} for _ in range(field_count)]  # length -> sorted (value, slot)
+        self.word_terms = [{} for _ in range(field_count)]   # length -> sorted (word, slot)
+        self.by_length = [{} for _ in range(field_count)]    # length -> set of slots
+        self.grams = [{} for _ in range(field_count)]        # trigram -> set of slots
+        self.blobs = [{} for _ in range(field_count)]        # length -> (NUL-joined values, slots)
+        self._next_slot = 0
+
+    def add(self, rows, fields: Sequence[str]):
+        # Last copy of each id wins
+        rows = list({str(row["id"]): row for row in rows}.values())
+        bulk = len(rows) >= BULK_THRESHOLD
+        dirty = {}
+
+        # Drop every replaced row first: discard bisects, so it must run while
+        # the term buckets are still sorted, before bulk appends
+        for row in rows:
+            self.discard(str(row["id"]))
+
+        for row in rows:
+            slot = self._next_slot
+            self._next_slot += 1
+            values = tuple(normalize(row.get(field)) for field in fields)
+
+            self.slots[str(row["id"])] = slot
+            self.rows[slot] = row
+            self.values[slot] = values
+            for index, value in enumerate(values):
+                if not value:
+                    continue
+                length = len(value)
+                entries = [(self.value_terms[index], (value, slot))]
+                entries.extend((self.word_terms[index], (word, slot)) for word in _words(value))
+                for terms, entry in entries:
+                    bucket = terms.setdefault(length, [])
+                    if bulk:
+                        bucket.append(entry)
+                        dirty[id(bucket)] = bucket
+                    else:
+                        insort(bucket, entry)
+                self.by_length[index].setdefault(length, set()).add(slot)
+                self.blobs[index].pop(length, None)
+                for gram in _trigrams(value):
+                    self.grams[index].setdefault(gram, set()).add(slot)
+
+        for bucket in dirty.values():
+            bucket.sort()
+
+    def discard(self, row_id: str):
+        slot = self.slots.pop(row_id, None)
+        if slot is None:
+            return
+        values = self.values.pop(slot)
+        del self.rows[slot]
+
+        for index, value in enumerate(values):
+            if not value:
+                continue
+            length = len(value)
+            entries = [(self.value_terms[index], (value, slot))]
+            entries.extend((self.word_terms[index], (word, slot)) for word in _words(value))
+            for terms, entry in entries:
+                bucket = terms[length]
+                position = bisect_left(bucket, entry)
+                if position < len(bucket) and bucket[position] == entry:
+                    del bucket[position]
+                if not bucket:
+                    del terms[length]
+
+            self.blobs[index].pop(length, None)
+            same_length = self.by_length[index][length]
+            same_length.discard(slot)
+            if not same_length:
+                del self.by_length[index][length]
+            for gram in _trigrams(value):
+                postings = self.grams[index][gram]
+                postings.discard(slot)
+                if not postings:
+                    del self.grams[index][gram]
+
+    def find(self, index: int, field: str, value: str) -> Optional[dict]:
+        key = normalize(value)
+        for slot in _prefix_range(self.value_terms[index].get(len(key), ()), key):
+            row = self.rows[slot]
+            if row.get(field) == value:
+                return row
+        return None
+
+    def warm(self):
+        """
+        Build every blob up front so the first short query doesn't pay for it.
+        """
+        for index, by_length in enumerate(self.by_length):
+            for length in by_length:
+                self._blob(index, length)
+
+    def _blob(self, index: int, length: int):
+        blob = self.blobs[index].get(length)
+        if blob is None:
+            slots = list(self.by_length[index][length])
+            blob = ("\0".join(self.values[slot][index] for slot in slots), slots)
+            self.blobs[index][length] = blob
+        return blob
+
+    def _scan(self, index: int, length: int, query: str):
+        # Every value in a blob has the same length, so offsets map straight to slots
+        text, slots = self._blob(index, length)
+        stride = length + 1
+        position = text.find(query)
+        while position != -1:
+            entry = position // stride
+            yield slots[entry]
+            position = text.find(query, (entry + 1) * stride)
+
+    def _contains(self, index: int, query: str):
+        by_length = self.by_length[index]
+        if len(query) < 3:
+            # Too short for trigrams: scan the same-length blobs instead
+            for length in sorted(by_length):
+                if length >= len(query):
+                    yield from self._scan(index, length, query)
+            return
+
+        postings = self.grams[index]
+        candidates = min((postings.get(gram, _EMPTY) for gram in _trigrams(query)), key=len)
+        if not candidates:
+            return
+        for length in sorted(by_length):
+            if length < len(query):
+                continue
+            for slot in by_length[length] & candidates:
+                if query in self.values[slot][index]:
+                    yield slot
+
+    def ranked(self, query: str, substring: bool):
+        """
+        Yield matching slots best first, possibly repeating a slot.
+
+        Order is exact value, value prefix, word prefix, then (for substring
+        mode) any substring; within a tier earlier fields and shorter values
+        come first.
+        """
+        fields = range(len(self.value_terms))
+        for index in fields:
+            yield from _prefix_range(self.value_terms[index].get(len(query), ()), query)
+        for index in fields:
+            terms = self.value_terms[index]
+            for length in sorted(terms):
+                if length > len(query):
+                    yield from _prefix_range(terms[length], query)
+        for index in fields:
+            terms = self.word_terms[index]
+            for length in sorted(terms):
+                yield from _prefix_range(terms[length], query)
+        if substring:
+            for index in fields:
+                yield from self._contains(index, query)
+
+
+def _latest_stamp(rows, current: Optional[str]) -> Optional[str]:
+    for row in rows:
+        for column in ("created_at", "updated_at"):
+            stamp = row.get(column)
+            if stamp and (current is None or stamp > current):
+                current = stamp
+    return current
+
+
+class SearchIndex:
+    """
+    Per-worker in-memory index over a few text columns of one table.
+
+    Rows are pulled from `created_at`/`updated_at` watermarks at most every
+    REFRESH_INTERVAL seconds and the whole table is re-read every
+    REBUILD_INTERVAL seconds. Database reads happen outside the index lock;
+    a rebuild is built on the side and swapped in. Writes made by this
+    worker should be applied with `upsert`, `reload` or `remove` rather than
+    waiting for the watermark.
+    """
+
+    def __init__(self, table: str, columns: str, fields: Sequence[str]):
+        self.table = table
+        self.columns = columns
+        self.fields = tuple(fields)
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+        self._postings = _Postings(len(self.fields))
+        self._pending = None    # local writes made while a rebuild is being fetched
+        self._watermark = None
+        self._checked = 0.0
+        self._built = None
+
+    # -------- maintenance --------
+
+    def upsert(self, row: dict):
+        self.upsert_many([row])
+
+    def upsert_many(self, rows):
+        rows = list(rows)
+        with self._lock:
+            self._postings.add(rows, self.fields)
+            if self._pending is not None:
+                self._pending.append(("upsert", rows))
+
+    def remove(self, row_id):
+        with self._lock:
+            self._postings.discard(str(row_id))
+            if self._pending is not None:
+                self._pending.append(("remove", str(row_id)))
+
+    def reload(self, row_id):
+        """
+        Re-read one row by id and apply it, dropping it if it no longer exists.
+        """
+        rows = supabase.table(self.table).select(self.columns).eq("id", row_id).execute().data
+        if rows:
+            self.upsert_many(rows)
+        else:
+            self.remove(row_id)
+
+    def _fetch(self, build_query):
+        rows = []
+        offset = 0
+        while True:
+            page = build_query().order("id").range(offset, offset + PAGE_SIZE - 1).execute().data
+            rows.extend(page)
+            if len(page) < PAGE_SIZE:
+                return rows
+            offset += PAGE_SIZE
+
+    def refresh(self, force: bool = False):
+        if not force and time.monotonic() - self._checked < REFRESH_INTERVAL:
+            return
+
+        # Only a cold index makes callers wait; otherwise one thread refreshes
+        # while the rest keep serving the current snapshot
+        if not self._refreshing.acquire(blocking=self._built is None):
+            return
+        try:
+            now = time.monotonic()
+            if not force and now - self._checked < REFRESH_INTERVAL:
+                return
+            try:
+                if self._watermark is None or self._built is None or now - self._built >= REBUILD_INTERVAL:
+                    self._rebuild(now)
+                else:
+                    # Rows stamped exactly at the watermark are re-read; upserts are idempotent
+                    watermark = self._watermark
+                    rows = self._fetch(
+                        lambda: supabase.table(self.table).select(self.columns)
+                        .or_(f'created_at.gte."{watermark}",updated_at.gte."{watermark}"')
+                    )
+                    self.upsert_many(rows)
+                    self._watermark = _latest_stamp(rows, self._watermark)
+            finally:
+                # A failed read also waits out the interval instead of retrying on every call
+                self._checked = now
+        finally:
+            self._refreshing.release()
+
+    def _rebuild(self, now: float):
+        with self._lock:
+            self._pending = []
+        try:
+            rows = self._fetch(lambda: supabase.table(self.table).select(self.columns))
+            fresh = _Postings(len(self.fields))
+            fresh.add(rows, self.fields)
+            fresh.warm()
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+
+        with self._lock:
+            for action, item in self._pending:
+                if action == "upsert":
+                    fresh.add(item, self.fields)
+                else:
+                    fresh.discard(item)
+            self._postings = fresh
+            self._pending = None
+        self._watermark = _latest_stamp(rows, None)
+        self._built = now
+
+    # -------- lookups --------
+
+    def find(self, field: str, value: str) -> Optional[dict]:
+        """
+        Exact (case-sensitive) match on one indexed field.
+
+        Returns None when the index cannot answer, so callers fall back to
+        the database: a cold index is never built here, and a failed refresh
+        leaves the last good snapshot in place.
+        """
+        if self._built is None:
+            return None
+        try:
+            self.refresh()
+        except Exception:
+            pass
+        with self._lock:
+            return self._postings.find(self.fields.index(field), field, value)
+
+    def search(self, query: str, limit: int = 20, mode: SearchMode = "substring") -> list:
+        query = normalize(query)
+        if not query:
+            return []
+        limit = max(1, min(limit, MAX_LIMIT))
+
+        self.refresh()
+        with self._lock:
+            postings = self._postings
+            seen = set()
+            results = []
+            for slot in postings.ranked(query, substring=mode == "substring"):
+                if slot in seen:
+                    continue
+                seen.add(slot)
+                results.append(postings.rows[slot])
+                if len(results) == limit:
+                    break
+            return results
+
+
+organization_index = SearchIndex(
+    "organizations",
+    "*",
+    fields=("name", "head", "email"),
+)
+
+admin_index = SearchIndex(
+    "admins",
+    "id, name, email, contact, role, language, org_id, created_at, updated_at, organizations(name)",
+    fields=("name", "email"),
+)
@@ -0,0 +1,8 @@
+import os
+import sys
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# database.py builds a live Supabase client at import time; tests patch in their own
+sys.modules.setdefault("database", types.SimpleNamespace(supabase=None))
@@ -0,0 +1,158 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("jose")
+
+import httpx
+from fastapi import FastAPI
+
+from admission import AdmissionController, AdmissionMiddleware, RouteClass, TokenBuckets, classify, client_key
+from auth_utils import create_access_token
+
+
+def test_client_map_is_bounded_lru():
+    buckets = TokenBuckets(rate=10, burst=40, max_clients=3)
+    for i in range(10):
+        buckets.take(f"client-{i}")
+    buckets.take("client-7")
+    buckets.take("client-10")
+
+    assert list(buckets._buckets) == ["client-9", "client-7", "client-10"]
+
+
+def test_burst_then_limit_reports_wait():
+    buckets = TokenBuckets(rate=1, burst=2, max_clients=10)
+
+    assert buckets.take("a") == 0
+    assert buckets.take("a") == 0
+    assert buckets.take("a") == pytest.approx(1, abs=0.01)
+    assert buckets.snapshot()["limited"] == 1
+
+
+def test_zero_rate_disables_limiting():
+    buckets = TokenBuckets(rate=0, burst=40, max_clients=10)
+
+    assert all(buckets.take("a") == 0 for _ in range(100))
+    assert buckets.snapshot()["enabled"] is False
+
+
+@pytest.mark.parametrize("method, path, expected", [
+    ("POST", "/auth/login", "auth"),
+    ("GET", "/analytics/organizations/timeline", "analytics"),
+    ("POST", "/organization/add", "writes"),
+    ("DELETE", "/admin/delete/1", "writes"),
+    ("GET", "/organization/list", "lists"),
+    ("GET", "/admin/search", "lists"),
+    ("GET", "/", None),
+    ("GET", "/admission/metrics", None),
+    ("OPTIONS", "/analytics/students", None),
+])
+def test_classify(method, path, expected):
+    assert classify(method, path) == expected
+
+
+def test_client_key_prefers_jwt_sub():
+    token = create_access_token({"sub": "root@example.com"})
+    scope = {"headers": [(b"authorization", f"Bearer {token}".encode())], "client": ("10.0.0.1", 1234)}
+
+    assert client_key(scope) == "sub:root@example.com"
+
+
+def test_client_key_falls_back_to_peer_address():
+    invalid = {"headers": [(b"authorization", b"Bearer not-a-jwt")], "client": ("10.0.0.1", 1234)}
+
+    assert client_key(invalid) == "ip:10.0.0.1"
+    assert client_key({"headers": [], "client": ("10.0.0.2", 1)}) == "ip:10.0.0.2"
+    assert client_key({"headers": []}) == "ip:unknown"
+
+
+def test_zero_queue_sheds_when_slots_are_busy():
+    async def scenario():
+        route_class = RouteClass("analytics", limit=1, queue_size=0, timeout=0, retry_after=5)
+        assert await route_class.acquire()
+        assert not await route_class.acquire()
+        route_class.release()
+        assert await route_class.acquire()
+        return route_class.snapshot()
+
+    snapshot = asyncio.run(scenario())
+    assert snapshot["admitted"] == 2
+    assert snapshot["rejected"] == 1
+
+
+def test_queued_request_is_admitted_on_release():
+    async def scenario():
+        route_class = RouteClass("lists", limit=1, queue_size=1, timeout=1, retry_after=2)
+        assert await route_class.acquire()
+
+        waiter = asyncio.create_task(route_class.acquire())
+        await asyncio.sleep(0)
+        assert route_class.queued == 1
+        # Queue is full, so a third caller is turned away
+        assert not await route_class.acquire()
+
+        route_class.release()
+        assert await waiter
+        return route_class.snapshot()
+
+    snapshot = asyncio.run(scenario())
+    assert snapshot["active"] == 1
+    assert snapshot["queued"] == 0
+    assert snapshot["rejected"] == 1
+
+
+def test_queued_request_times_out():
+    async def scenario():
+        route_class = RouteClass("writes", limit=1, queue_size=4, timeout=0.01, retry_after=1)
+        assert await route_class.acquire()
+        assert not await route_class.acquire()
+        return route_class.snapshot()
+
+    snapshot = asyncio.run(scenario())
+    assert snapshot["timed_out"] == 1
+    assert snapshot["queued"] == 0
+
+
+def make_app(rate_limiter):
+    controller = AdmissionController()
+    controller.rate_limiter = rate_limiter
+    app = FastAPI()
+
+    @app.get("/analytics/slow")
+    async def slow():
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+    return app, controller
+
+
+async def get_many(app, count, path="/analytics/slow"):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await asyncio.gather(*(client.get(path) for _ in range(count)))
+
+
+def test_middleware_sheds_analytics_burst_with_retry_after():
+    app, controller = make_app(TokenBuckets(rate=0, burst=0, max_clients=10))
+    limit = controller.classes["analytics"].limit
+
+    responses = asyncio.run(get_many(app, limit * 2))
+
+    assert sorted(response.status_code for response in responses) == [200] * limit + [429] * limit
+    shed = [response for response in responses if response.status_code == 429]
+    assert all(response.headers["Retry-After"] == "5" for response in shed)
+    assert controller.snapshot()["classes"]["analytics"]["rejected"] == limit
+    assert controller.snapshot()["classes"]["analytics"]["active"] == 0
+
+
+def test_middleware_rate_limits_per_client():
+    app, controller = make_app(TokenBuckets(rate=1, burst=1, max_clients=10))
+
+    first, second = asyncio.run(get_many(app, 2))
+
+    assert {first.status_code, second.status_code} == {200, 429}
+    limited = first if first.status_code == 429 else second
+    assert limited.json() == {"detail": "Rate limit exceeded"}
+    assert limited.headers["Retry-After"] == "1"
@@ -0,0 +1,278 @@
+import re
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import search_index
+from search_index import SearchIndex
+
+
+class FakeQuery:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.filters = []
+        self.bounds = None
+
+    def select(self, columns):
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: str(row.get(column)) == str(value))
+        return self
+
+    def or_(self, expression):
+        clauses = re.findall(r'(\w+)\.gte\."([^"]+)"', expression)
+        self.filters.append(
+            lambda row: any(row.get(column) and row[column] >= value for column, value in clauses)
+        )
+        self.client.or_filters.append(expression)
+        return self
+
+    def order(self, column):
+        return self
+
+    def range(self, start, end):
+        self.bounds = (start, end + 1)
+        return self
+
+    def execute(self):
+        self.client.queries += 1
+        rows = sorted(
+            (row for row in self.client.tables[self.table] if all(check(row) for check in self.filters)),
+            key=lambda row: str(row["id"]),
+        )
+        if self.bounds:
+            rows = rows[self.bounds[0]:self.bounds[1]]
+        return SimpleNamespace(data=[dict(row) for row in rows])
+
+
+class FakeClient:
+    def __init__(self, **tables):
+        self.tables = tables
+        self.queries = 0
+        self.or_filters = []
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    fake = FakeClient(organizations=[])
+    monkeypatch.setattr(search_index, "supabase", fake)
+    return fake
+
+
+def make_index():
+    return SearchIndex("organizations", "*", fields=("name", "email"))
+
+
+def org(row_id, name, email="", stamp="2024-01-01T00:00:00+00:00"):
+    return {"id": row_id, "name": name, "email": email, "created_at": stamp, "updated_at": stamp}
+
+
+def names(rows):
+    return [row["name"] for row in rows]
+
+
+def test_value_prefix_outranks_word_prefix_beyond_alphabetical_cap(client):
+    client.tables["organizations"] = [org(i, f"Zed Aa{i:03}") for i in range(200)]
+    client.tables["organizations"].append(org(999, "Azure Corp"))
+    index = make_index()
+
+    assert names(index.search("a", 5, "prefix"))[0] == "Azure Corp"
+    assert names(index.search("a", 5, "substring"))[0] == "Azure Corp"
+
+
+def test_ranking_tiers(client):
+    client.tables["organizations"] = [
+        org(1, "Northern Acme Labs"),
+        org(2, "Acme"),
+        org(3, "Acme Industries"),
+        org(4, "Pacmen", email="info@acme.io"),
+        org(5, "Unrelated", email="x@y.io"),
+    ]
+    index = make_index()
+
+    assert names(index.search("ACME", 10)) == ["Acme", "Acme Industries", "Northern Acme Labs", "Pacmen"]
+    assert names(index.search("acme", 10, "prefix")) == ["Acme", "Acme Industries", "Northern Acme Labs", "Pacmen"]
+    assert names(index.search("cme", 10, "prefix")) == []
+    # Substring matches go by field, then shorter values first
+    assert names(index.search("cme", 2)) == ["Acme", "Pacmen"]
+
+
+def test_upsert_and_remove_round_trip(client):
+    index = make_index()
+    index.search("warm up")
+    empty = index._postings
+
+    index.upsert(org(1, "Acme Corp", "hello@acme.io"))
+    index.upsert(org(1, "Beta Corp", "hello@beta.io"))
+    assert names(index.search("corp")) == ["Beta Corp"]
+    assert index.search("acme") == []
+
+    index.remove(1)
+    assert index.search("corp") == []
+    for structures in (empty.value_terms, empty.word_terms, empty.by_length, empty.grams):
+        assert all(not per_field for per_field in structures)
+    assert not empty.rows and not empty.slots
+
+
+def test_find_is_exact_and_case_sensitive(client):
+    client.tables["organizations"] = [org(1, "Acme"), org(2, "Acme Labs")]
+    index = make_index()
+    index.search("warm up")
+
+    assert index.find("name", "Acme")["id"] == 1
+    assert index.find("name", "acme") is None
+    assert index.find("name", "Acm") is None
+
+
+def test_full_build_pages_through_table(client, monkeypatch):
+    monkeypatch.setattr(search_index, "PAGE_SIZE", 3)
+    client.tables["organizations"] = [org(i, f"Org {i}") for i in range(10)]
+    index = make_index()
+
+    assert len(index.search("org", 20)) == 10
+    assert client.queries == 4
+
+
+def test_refresh_pulls_rows_past_watermark(client, monkeypatch):
+    client.tables["organizations"] = [org(1, "Acme", stamp="2024-01-01T00:00:00+00:00")]
+    index = make_index()
+    assert names(index.search("acme")) == ["Acme"]
+
+    client.tables["organizations"] = [
+        org(1, "Acme Renamed", stamp="2024-02-01T00:00:00+00:00"),
+        org(2, "Acme Two", stamp="2024-02-02T00:00:00+00:00"),
+    ]
+    # Within the refresh interval nothing is re-read
+    assert names(index.search("acme")) == ["Acme"]
+
+    index.refresh(force=True)
+    assert client.or_filters == [
+        'created_at.gte."2024-01-01T00:00:00+00:00",updated_at.gte."2024-01-01T00:00:00+00:00"'
+    ]
+    assert names(index.search("acme")) == ["Acme Two", "Acme Renamed"]
+    assert index._watermark == "2024-02-02T00:00:00+00:00"
+
+
+def test_local_write_during_rebuild_survives_swap(client, monkeypatch):
+    client.tables["organizations"] = [org(1, "Acme")]
+    index = make_index()
+    index.search("acme")
+
+    fetch = index._fetch
+
+    def fetch_with_concurrent_write(build_query):
+        rows = fetch(build_query)
+        index.upsert(org(2, "Written Meanwhile"))
+        return rows
+
+    monkeypatch.setattr(index, "_fetch", fetch_with_concurrent_write)
+    monkeypatch.setattr(search_index, "REBUILD_INTERVAL", 0)
+    index.refresh(force=True)
+
+    assert names(index.search("meanwhile")) == ["Written Meanwhile"]
+
+
+def test_common_substring_stops_at_limit(client):
+    client.tables["organizations"] = [
+        org(i, f"Company {i}", email=f"user{i}@example.com") for i in range(30000)
+    ]
+    index = make_index()
+    index.search("warm up")
+
+    started = time.perf_counter()
+    results = index.search("example.com", 20)
+    elapsed = time.perf_counter() - started
+
+    assert len(results) == 20
+    assert elapsed < 0.05
+
+
+def test_short_substring_scans_same_length_values(client):
+    client.tables["organizations"] = [org(1, "Alpha"), org(2, "Gamma"), org(3, "Ox"), org(4, "Bo", email="x9@y.io")]
+    index = make_index()
+
+    assert names(index.search("mm", 10)) == ["Gamma"]
+    assert names(index.search("9", 10)) == ["Bo"]
+
+    index.upsert(org(5, "Hammer"))
+    assert names(index.search("mm", 10)) == ["Gamma", "Hammer"]
+
+
+def test_reload_applies_or_drops_single_row(client):
+    client.tables["organizations"] = [org(1, "Acme")]
+    index = make_index()
+    index.search("acme")
+
+    client.tables["organizations"] = [org(1, "Acme Renamed")]
+    index.reload(1)
+    assert names(index.search("acme")) == ["Acme Renamed"]
+    assert index.find("name", "Acme") is None
+
+    client.tables["organizations"] = []
+    index.reload("1")
+    assert index.search("acme") == []
+
+
+def test_bulk_batch_mixing_new_and_updated_rows(client):
+    # New names share a length with, and sort before, the names being
+    # replaced, so bulk appends land ahead of the entries to discard
+    client.tables["organizations"] = [org(i, f"Zz{i:04}") for i in range(10)]
+    index = make_index()
+    index.search("warm up")
+
+    batch = [org(100 + i, f"Za{i:04}") for i in range(70)]
+    batch += [org(i, f"Zc{i:04}") for i in range(10)]
+    assert len(batch) >= search_index.BULK_THRESHOLD
+    index.upsert_many(batch)
+
+    postings = index._postings
+    for per_field in (postings.value_terms, postings.word_terms):
+        for by_length in per_field:
+            for bucket in by_length.values():
+                assert bucket == sorted(bucket)
+                assert all(slot in postings.rows for _, slot in bucket)
+    assert len(index.search("z", 100)) == 80
+    assert names(index.search("zc0003")) == ["Zc0003"]
+    assert index.search("zz") == []
+
+
+def test_duplicate_ids_in_one_batch_keep_last(client):
+    index = make_index()
+    index.search("warm up")
+
+    index.upsert_many([org(1, f"Copy {n}") for n in range(search_index.BULK_THRESHOLD)])
+
+    assert names(index.search("copy", 100)) == [f"Copy {search_index.BULK_THRESHOLD - 1}"]
+
+
+def test_find_on_cold_index_leaves_lookup_to_caller(client):
+    client.tables["organizations"] = [org(1, "Acme")]
+    index = make_index()
+
+    assert index.find("name", "Acme") is None
+    assert client.queries == 0
+
+
+def test_find_survives_failed_refresh_and_backs_off(client, monkeypatch):
+    client.tables["organizations"] = [org(1, "Acme")]
+    index = make_index()
+    index.search("warm up")
+
+    calls = []
+
+    def broken_fetch(build_query):
+        calls.append(build_query)
+        raise RuntimeError("supabase unavailable")
+
+    monkeypatch.setattr(index, "_fetch", broken_fetch)
+    index._checked = 0.0
+
+    assert index.find("name", "Acme")["id"] == 1
+    assert index.find("name", "Acme")["id"] == 1
+    assert len(calls) == 1
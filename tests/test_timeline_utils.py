@@ -0,0 +1,70 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from routers.analytics import _build_timeline
+from timeline_utils import MAX_BUCKETS, Timeline, get_zone, resolve_range
+
+NEW_YORK = get_zone("America/New_York")
+
+
+def test_hour_buckets_skip_spring_forward_hour():
+    start, end = resolve_range("1month", "2024-03-01", "2024-03-31", NEW_YORK)
+    timeline = Timeline(start, end, "hour", NEW_YORK)
+
+    assert len(timeline) == 31 * 24 - 1
+
+
+def test_hour_buckets_repeat_fall_back_hour():
+    start, end = resolve_range("1month", "2024-11-01", "2024-11-30", NEW_YORK)
+    timeline = Timeline(start, end, "hour", NEW_YORK)
+
+    assert len(timeline) == 30 * 24 + 1
+
+
+def test_day_buckets_follow_local_midnight_across_dst():
+    start, end = resolve_range("7days", "2024-03-09", "2024-03-11", NEW_YORK)
+    timeline = Timeline(start, end, "day", NEW_YORK)
+
+    # Mar 10 is only 23 hours long in New York
+    assert timeline.starts[2].timestamp() - timeline.starts[1].timestamp() == 23 * 3600
+    result = timeline.tally(
+        [
+            {"created_at": "2024-03-11T03:59:59+00:00"},  # 23:59:59 EDT on Mar 10
+            {"created_at": "2024-03-11T04:00:00Z"},       # 00:00 EDT on Mar 11
+        ],
+        keys=("count",),
+        key_for=lambda row: "count",
+    )
+    assert [row["count"] for row in result] == [0, 1, 1]
+    assert [row["date"] for row in result] == ["2024-03-09", "2024-03-10", "2024-03-11"]
+
+
+def test_rows_outside_range_are_ignored():
+    start, end = resolve_range("7days", "2024-01-01", "2024-01-02", get_zone("UTC"))
+    timeline = Timeline(start, end, "day", get_zone("UTC"))
+
+    assert timeline.index(datetime.fromisoformat("2023-12-31T23:59:59+00:00")) is None
+    assert timeline.index(datetime.fromisoformat("2024-01-03T00:00:00+00:00")) is None
+    assert timeline.index(datetime.fromisoformat("2024-01-02T12:00:00+00:00")) == 1
+
+
+def test_start_after_end_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        _build_timeline("7days", "day", "2024-03-10", "2024-03-01", "UTC")
+    assert error.value.status_code == 400
+
+
+def test_too_many_buckets_is_rejected():
+    # A leap year of hours is 8784 buckets
+    assert 366 * 24 > MAX_BUCKETS
+    with pytest.raises(HTTPException) as error:
+        _build_timeline("year", "hour", "2020-01-01", "2020-12-31", "UTC")
+    assert error.value.status_code == 400
+
+
+def test_unknown_time_zone_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        _build_timeline("7days", "day", None, None, "Mars/Olympus_Mons")
+    assert error.value.status_code == 400
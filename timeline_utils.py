@@ -0,0 +1,189 @@
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable, Optional, Sequence
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+GRANULARITIES = ("hour", "day", "week", "month")
+MAX_BUCKETS = 5000
+
+TIMEFRAME_DAYS = {
+    "7days": 7,
+    "15days": 15,
+    "1month": 30,
+    "quarter": 90,
+    "halfyear": 180,
+    "year": 365,
+}
+
+DATE_FORMATS = {
+    "hour": "%Y-%m-%dT%H:00",
+    "day": "%Y-%m-%d",
+    "week": "%Y-%m-%d",
+    "month": "%Y-%m-%d",
+}
+
+LABEL_FORMATS = {
+    "hour": "%b %d %H:00",
+    "day": "%b %d",
+    "month": "%b",
+}
+
+
+def get_zone(tz: str):
+    try:
+        return ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown time zone: {tz}")
+
+
+def parse_timestamp(value: str) -> datetime:
+    """
+    Parse a Supabase timestamp. Naive values are treated as UTC.
+    """
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def resolve_range(timeframe: str, start_date: Optional[str], end_date: Optional[str], zone):
+    """
+    Return an aware [start, end) range in `zone`.
+
+    Custom dates (YYYY-MM-DD) are whole local days, both inclusive. Otherwise
+    the range ends now and reaches back the number of days in `timeframe`.
+    """
+    if start_date or end_date:
+        try:
+            end = (
+                datetime.strptime(end_date, "%Y-%m-%d").replace(tzinfo=zone) + timedelta(days=1)
+                if end_date else datetime.now(zone)
+            )
+            start = (
+                datetime.strptime(start_date, "%Y-%m-%d").replace(tzinfo=zone)
+                if start_date else end - timedelta(days=TIMEFRAME_DAYS.get(timeframe, 7))
+            )
+        except ValueError:
+            raise ValueError("Dates must be in YYYY-MM-DD format")
+    else:
+        end = datetime.now(zone)
+        start = end - timedelta(days=TIMEFRAME_DAYS.get(timeframe, 7))
+
+    if start >= end:
+        raise ValueError("start_date must be before end_date")
+    return start, end
+
+
+def floor_to_bucket(moment: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _next_month(moment: datetime) -> datetime:
+    if moment.month == 12:
+        return moment.replace(year=moment.year + 1, month=1)
+    return moment.replace(month=moment.month + 1)
+
+
+class Timeline:
+    """
+    Contiguous buckets covering [start, end) at the given granularity.
+
+    Day, week and month boundaries follow local wall-clock time in the
+    timeline's zone, so they stay aligned across DST changes; hour buckets
+    step in absolute time. Weeks are 7-day runs from the first day of the
+    range. Rows are assigned with a bisect over the bucket edges.
+    """
+
+    def __init__(self, start: datetime, end: datetime, granularity: str, zone):
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of: {', '.join(GRANULARITIES)}")
+
+        self.granularity = granularity
+        self.zone = zone
+        self.start = start
+        self.end = end
+
+        first = floor_to_bucket(start.astimezone(zone), granularity)
+        self.starts = []
+        current = first
+        while current < end:
+            if len(self.starts) >= MAX_BUCKETS:
+                raise ValueError("Range is too large for the requested granularity")
+            self.starts.append(current)
+            if granularity == "hour":
+                current = (current.astimezone(timezone.utc) + timedelta(hours=1)).astimezone(zone)
+            elif granularity == "day":
+                current = first + timedelta(days=len(self.starts))
+            elif granularity == "week":
+                current = first + timedelta(weeks=len(self.starts))
+            else:
+                current = _next_month(current)
+
+        self._edges = [moment.timestamp() for moment in self.starts]
+        self._end = end.timestamp()
+
+    def __len__(self):
+        return len(self.starts)
+
+    def index(self, moment: datetime) -> Optional[int]:
+        """
+        Return the bucket index for `moment`, or None if it falls outside the range.
+        """
+        stamp = moment.timestamp()
+        if stamp >= self._end:
+            return None
+        position = bisect_right(self._edges, stamp) - 1
+        return position if position >= 0 else None
+
+    def label(self, position: int) -> str:
+        if self.granularity == "week":
+            return f"Week {position + 1}"
+        return self.starts[position].strftime(LABEL_FORMATS[self.granularity])
+
+    def tally(
+        self,
+        rows: Iterable[dict],
+        keys: Sequence[str],
+        key_for: Callable[[dict], Optional[str]],
+        timestamp_field: str = "created_at",
+    ) -> list:
+        """
+        Count rows per bucket in a single pass.
+
+        `key_for` maps a row to one of `keys`; rows mapped to anything else,
+        or with no timestamp, are skipped.
+        """
+        keys = tuple(keys)
+        counts = [dict.fromkeys(keys, 0) for _ in self.starts]
+        for row in rows:
+            key = key_for(row)
+            value = row.get(timestamp_field)
+            if key not in keys or not value:
+                continue
+            position = self.index(parse_timestamp(value))
+            if position is not None:
+                counts[position][key] += 1
+
+        date_format = DATE_FORMATS[self.granularity]
+        return [
+            {
+                "date": moment.strftime(date_format),
+                "label": self.label(position),
+                **counts[position],
+            }
+            for position, moment in enumerate(self.starts)
+        ]
+
+    def query_bounds(self):
+        """
+        UTC ISO bounds for a `gte`/`lt` filter on the timestamp column.
+        """
+        return (
+            self.starts[0].astimezone(timezone.utc).isoformat(),
+            self.end.astimezone(timezone.utc).isoformat(),
+        )